@@ -1,5 +1,6 @@
 import sys
 import os
+import threading
 from pathlib import Path
 
 # Ensure env vars are loaded early
@@ -13,9 +14,20 @@ else:
     load_dotenv()
 
 
-from src.ews_exchange_mcp.server import mcp
-
 def main():
+    if sys.argv[1:2] == ["export"]:
+        from src.ews_exchange_mcp.export import main as export_main
+        sys.exit(export_main(sys.argv[2:]))
+
+    # Imported here so the export CLI does not build the FastMCP app
+    from src.ews_exchange_mcp.server import mcp
+    from src.ews_exchange_mcp.client import get_ews_client
+    from src.ews_exchange_mcp.config import EWS_PREWARM_CONNECTIONS
+
+    if EWS_PREWARM_CONNECTIONS > 0:
+        # Connect and pre-warm in the background so the transport starts listening immediately
+        threading.Thread(target=get_ews_client, name="ews-prewarm", daemon=True).start()
+
     mode = os.environ.get("MCP_MODE", "stdio")
     port = int(os.environ.get("MCP_PORT", 3101)) # Different port to test alongside Node
     if mode == "http":
@@ -2,18 +2,20 @@ from exchangelib import Credentials, Configuration, Account, DELEGATE
 import urllib3
 import logging
 import ssl
+import threading
 
-from .config import EWS_ENDPOINT, EWS_USERNAME, EWS_PASSWORD, NODE_TLS_REJECT_UNAUTHORIZED
+from .config import (
+    EWS_ENDPOINT, EWS_USERNAME, EWS_PASSWORD, NODE_TLS_REJECT_UNAUTHORIZED,
+    EWS_MAX_CONNECTIONS, EWS_PREWARM_CONNECTIONS,
+)
+from .pool import KeepAliveAdapter, configure_pool, prewarm_sessions
 
 logger = logging.getLogger("ews_mcp")
 
 # Handle SSL verification bypass securely and dynamically
 if NODE_TLS_REJECT_UNAUTHORIZED == "0":
-    import requests
-    from exchangelib.protocol import BaseProtocol
-    
     # 彻底关闭证书校验并降低 SSL 严格程度以兼容旧版无修补的 Exchange Server
-    class TLSAdapter(requests.adapters.HTTPAdapter):
+    class TLSAdapter(KeepAliveAdapter):
         def init_poolmanager(self, *args, **kwargs):
             ctx = ssl.create_default_context()
             ctx.check_hostname = False
@@ -24,9 +26,11 @@ if NODE_TLS_REJECT_UNAUTHORIZED == "0":
             kwargs['ssl_context'] = ctx
             return super(TLSAdapter, self).init_poolmanager(*args, **kwargs)
 
-    BaseProtocol.HTTP_ADAPTER_CLS = TLSAdapter
+    configure_pool(TLSAdapter)
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
     logger.warning("SSL Certificate Verification is DISABLED with Legacy Ciphers Enabled.")
+else:
+    configure_pool()
 
 def _create_account() -> Account:
     logger.info("Initializing EWS Exchange Service connecting to %s...", EWS_ENDPOINT)
@@ -36,7 +40,8 @@ def _create_account() -> Account:
     config = Configuration(
         service_endpoint=EWS_ENDPOINT,
         credentials=credentials,
-        auth_type='NTLM'
+        auth_type='NTLM',
+        max_connections=EWS_MAX_CONNECTIONS
     )
     
     account = Account(
@@ -48,10 +53,17 @@ def _create_account() -> Account:
     return account
 
 _account_instance = None
+_account_lock = threading.Lock()
 
 def get_ews_client() -> Account:
     """Returns a singleton of the EWS Account."""
     global _account_instance
     if _account_instance is None:
-         _account_instance = _create_account()
+        # main.py may already be initializing the account in a background thread at startup
+        with _account_lock:
+            if _account_instance is None:
+                account = _create_account()
+                if EWS_PREWARM_CONNECTIONS > 0:
+                    prewarm_sessions(account.protocol, EWS_PREWARM_CONNECTIONS)
+                _account_instance = account
     return _account_instance
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -19,5 +20,18 @@ EWS_EXCHANGE_VERSION = os.getenv("EWS_EXCHANGE_VERSION", "Exchange2013")
 EWS_EMAIL_SIGNATURE = os.getenv("EWS_EMAIL_SIGNATURE", "")
 NODE_TLS_REJECT_UNAUTHORIZED = os.getenv("NODE_TLS_REJECT_UNAUTHORIZED", "1")
 
+# HTTP connection pool tuning (each pooled session holds exactly one TCP connection)
+EWS_MAX_CONNECTIONS = int(os.getenv("EWS_MAX_CONNECTIONS", "4"))
+EWS_PREWARM_CONNECTIONS = int(os.getenv("EWS_PREWARM_CONNECTIONS", "0"))
+EWS_SESSION_IDLE_TIMEOUT = int(os.getenv("EWS_SESSION_IDLE_TIMEOUT", "0"))
+EWS_SESSION_MAX_USAGE = int(os.getenv("EWS_SESSION_MAX_USAGE", "0"))
+EWS_TCP_KEEPALIVE = int(os.getenv("EWS_TCP_KEEPALIVE", "60"))
+EWS_HTTP_TIMEOUT = int(os.getenv("EWS_HTTP_TIMEOUT", "120"))
+
+# Directory that export_folder is allowed to write into. Relative paths are resolved against the project root, or
+# against the executable's directory for PyInstaller builds whose bundled sources live in a temporary directory
+export_base = Path(sys.executable).resolve().parent if getattr(sys, "frozen", False) else project_root
+EWS_EXPORT_DIR = str(export_base / os.getenv("EWS_EXPORT_DIR", "exports"))
+
 if not EWS_ENDPOINT or not EWS_USERNAME or not EWS_PASSWORD:
     raise ValueError("Missing essential EWS credentials (EWS_ENDPOINT, EWS_USERNAME, EWS_PASSWORD) in environment variables.")
@@ -0,0 +1,299 @@
+import argparse
+import collections
+import datetime
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from exchangelib import EWSDateTime, UTC
+
+from .config import EWS_MAX_CONNECTIONS
+from .folders import resolve_folders
+
+logger = logging.getLogger("ews_mcp")
+
+EXPORT_FORMATS = ("mbox", "eml")
+ID_PAGE_SIZE = 200
+FETCH_FIELDS = ['mime_content', 'sender', 'datetime_received']
+
+# mboxrd quoting: any line starting with (>*)From gets one more '>'
+_FROM_LINE = re.compile(rb"^(>*From )", re.MULTILINE)
+
+
+def _to_ews_datetime(value: str, tz) -> EWSDateTime:
+    """Parse an ISO date/datetime; naive values are interpreted in the mailbox timezone."""
+    dt = datetime.datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz)
+    else:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=UTC)
+    return EWSDateTime.from_datetime(dt)
+
+
+def _utc_iso(dt) -> str:
+    return dt.astimezone(UTC).isoformat()
+
+
+class MboxWriter:
+    """Appends messages to a single mbox file (mboxrd flavour)."""
+    def __init__(self, path: str, offset: int = 0):
+        if offset:
+            # Resuming is only safe if everything up to the checkpoint is still on disk
+            if not os.path.exists(path) or os.path.getsize(path) < offset:
+                raise ValueError("EXPORT_CHECKPOINT_MISMATCH: The mbox file is missing or shorter than its checkpoint. Restart the export without resume.")
+            # Drop anything written after the last checkpoint (e.g. a half-written message)
+            os.truncate(path, offset)
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+
+    def write(self, item):
+        sender = item.sender.email_address if item.sender and item.sender.email_address else "MAILER-DAEMON"
+        received = item.datetime_received.astimezone(UTC)
+        data = item.mime_content.replace(b"\r\n", b"\n")
+        data = _FROM_LINE.sub(rb">\1", data)
+        if not data.endswith(b"\n"):
+            data += b"\n"
+        self._file.write(f"From {sender} {received.strftime('%a %b %d %H:%M:%S %Y')}\n".encode())
+        self._file.write(data + b"\n")
+
+    def commit(self) -> dict:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"mbox_offset": self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class EmlDirWriter:
+    """Writes one .eml file per message into a directory; each file is written atomically."""
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, item):
+        received = item.datetime_received.astimezone(UTC)
+        digest = hashlib.sha1(item.id.encode()).hexdigest()[:12]
+        target = os.path.join(self.path, f"{received.strftime('%Y%m%dT%H%M%S')}_{digest}.eml")
+        tmp = target + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(item.mime_content)
+        os.replace(tmp, target)
+
+    def commit(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+def _load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def export_messages(
+    account,
+    folders: list,
+    output_path: str,
+    export_format: str = "mbox",
+    query: str = "",
+    start_date: str = "",
+    end_date: str = "",
+    batch_size: int = 50,
+    workers: int = EWS_MAX_CONNECTIONS,
+    resume: bool = True,
+    max_messages: int = 0
+) -> dict:
+    """Stream the MIME content of all matching messages to an mbox file or a directory of .eml files.
+
+    Folders are exported one after another; within each folder item ids are paged oldest-first, MIME content is
+    fetched in concurrent GetItem batches and written in order.
+    A checkpoint is saved after every batch so an interrupted export continues where it stopped.
+    With max_messages > 0 at most that many messages are handled per call and 'completed' reports whether more remain.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}. Supported: {', '.join(EXPORT_FORMATS)}.")
+    batch_size = max(batch_size, 1)
+    workers = max(workers, 1)
+
+    if export_format == "mbox":
+        parent = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(parent, exist_ok=True)
+        checkpoint_path = output_path + ".checkpoint.json"
+    else:
+        os.makedirs(output_path, exist_ok=True)
+        checkpoint_path = os.path.join(output_path, ".export_checkpoint.json")
+
+    params = {
+        "format": export_format,
+        "folders": [f.id for f in folders],
+        "query": query,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    state = _load_checkpoint(checkpoint_path) if resume else None
+    if state and state.get("params") != params:
+        raise ValueError("EXPORT_CHECKPOINT_MISMATCH: Existing checkpoint was created with different export parameters.")
+    resumed = state is not None
+    if not state:
+        state = {"params": params, "exported": 0, "skipped": 0, "mbox_offset": 0, "folder_index": 0, "folders": {}}
+    state["completed"] = False
+    processed_before = state["exported"] + state["skipped"]
+
+    tz = account.default_timezone
+    start = _to_ews_datetime(start_date, tz) if start_date else None
+    end = _to_ews_datetime(end_date, tz) if end_date else None
+    start_index = state["folder_index"]
+    # Snapshot the per-folder progress; the live state is updated while the id generator is still running
+    saved = {fid: dict(progress) for fid, progress in state["folders"].items()}
+
+    def _folder_ids(folder, progress):
+        """Yield (position, item) for one folder, oldest first, skipping what an earlier call already exported."""
+        resume_from = _to_ews_datetime(progress["last_received"], tz) if progress.get("last_received") else None
+        boundary_ids = set(progress.get("boundary_ids", []))
+        lower = max(d for d in (start, resume_from) if d is not None) if (start or resume_from) else None
+        if query:
+            # AQS query strings cannot be combined with other restrictions, so date bounds are checked client-side.
+            # Continue from the FindItem offset reached last time instead of re-reading every id; step back one
+            # page to absorb items deleted in the meantime, the watermark check below drops the duplicates.
+            qs = folder.filter(query)
+            position = max(progress.get("id_offset", 0) - ID_PAGE_SIZE, 0)
+        else:
+            date_filter = {}
+            if lower is not None:
+                date_filter['datetime_received__gte'] = lower
+            if end is not None:
+                date_filter['datetime_received__lt'] = end
+            qs = folder.filter(**date_filter) if date_filter else folder.all()
+            position = 0
+        qs = qs.order_by('datetime_received').only('id', 'changekey', 'datetime_received')
+        qs.page_size = ID_PAGE_SIZE
+        for item in (qs[position:] if position else qs):
+            position += 1
+            received = item.datetime_received
+            if end is not None and received >= end:
+                break
+            if lower is not None and received < lower:
+                continue
+            if resume_from is not None and item.id in boundary_ids and _utc_iso(received) == progress["last_received"]:
+                continue
+            yield position, item
+
+    def _pending():
+        # EWS only sorts within a folder, so folders are exported one after another, each with its own watermark
+        for index in range(start_index, len(folders)):
+            for position, item in _folder_ids(folders[index], saved.get(folders[index].id, {})):
+                yield index, position, item
+
+    def _fetch(chunk):
+        return list(account.fetch(ids=[(ref.id, ref.changekey) for _, _, ref in chunk], only_fields=FETCH_FIELDS, chunk_size=len(chunk)))
+
+    if export_format == "mbox":
+        writer = MboxWriter(output_path, state["mbox_offset"] if resumed else 0)
+    else:
+        writer = EmlDirWriter(output_path)
+
+    def _write_batch(chunk, results):
+        for (index, position, ref), item in zip(chunk, results):
+            if isinstance(item, Exception) or not item.mime_content:
+                logger.warning("Skipping message %s during export: %s", ref.id, item if isinstance(item, Exception) else "no MIME content")
+                state["skipped"] += 1
+            else:
+                writer.write(item)
+                state["exported"] += 1
+            state["folder_index"] = index
+            progress = state["folders"].setdefault(folders[index].id, {"last_received": None, "boundary_ids": [], "id_offset": 0})
+            received = _utc_iso(ref.datetime_received)
+            if received == progress["last_received"]:
+                progress["boundary_ids"].append(ref.id)
+            else:
+                progress["last_received"] = received
+                progress["boundary_ids"] = [ref.id]
+            progress["id_offset"] = position
+        state.update(writer.commit())
+        _save_checkpoint(checkpoint_path, state)
+
+    pending = _pending()
+    budget = itertools.islice(pending, max_messages) if max_messages > 0 else pending
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Keep at most `workers` batches in flight and write them back in order
+            in_flight = collections.deque()
+            for chunk in itertools.batched(budget, batch_size):
+                in_flight.append((chunk, executor.submit(_fetch, chunk)))
+                if len(in_flight) >= workers:
+                    done_chunk, future = in_flight.popleft()
+                    _write_batch(done_chunk, future.result())
+            while in_flight:
+                done_chunk, future = in_flight.popleft()
+                _write_batch(done_chunk, future.result())
+        # The budget may have stopped us exactly at the end; peek to tell whether anything is left
+        state["completed"] = budget is pending or next(pending, None) is None
+    finally:
+        writer.close()
+
+    if state["completed"]:
+        # A later run with the same arguments walks all folders again and only picks up new mail
+        state["folder_index"] = 0
+    _save_checkpoint(checkpoint_path, state)
+    logger.info("Exported %d message(s) to %s", state["exported"], output_path)
+    return {
+        "format": export_format,
+        "output": output_path,
+        "completed": state["completed"],
+        "processed_this_call": state["exported"] + state["skipped"] - processed_before,
+        "exported": state["exported"],
+        "skipped": state["skipped"],
+        "resumed": resumed,
+        "folder_index": state["folder_index"],
+        "folder_count": len(folders),
+    }
+
+
+def main(argv=None) -> int:
+    """Command line entry point: export a folder to mbox or EML files."""
+    parser = argparse.ArgumentParser(prog="export", description="Export Exchange folders to mbox or EML files.")
+    parser.add_argument("--folder", default="inbox", help="Folder name, comma-separated list or subtree like 'inbox/**'")
+    parser.add_argument("--format", dest="export_format", choices=EXPORT_FORMATS, default="mbox")
+    parser.add_argument("--output", required=True, help="mbox file path, or target directory for eml")
+    parser.add_argument("--query", default="", help="AQS query, e.g. 'subject:invoice'")
+    parser.add_argument("--start-date", default="", help="Only messages received on/after this ISO date")
+    parser.add_argument("--end-date", default="", help="Only messages received before this ISO date")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=EWS_MAX_CONNECTIONS)
+    parser.add_argument("--max-messages", type=int, default=0, help="Stop after this many messages (0 = no limit)")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    from .client import get_ews_client
+
+    account = get_ews_client()
+    result = export_messages(
+        account,
+        resolve_folders(account, args.folder),
+        args.output,
+        export_format=args.export_format,
+        query=args.query,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        resume=not args.no_resume,
+        max_messages=args.max_messages,
+    )
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
@@ -0,0 +1,80 @@
+def _well_known_folder(account, name_lower: str):
+    if name_lower in ["inbox", "收件箱"]: return account.inbox
+    if name_lower in ["sent", "sentitems", "已发送"]: return account.sent
+    if name_lower in ["drafts", "草稿箱"]: return account.drafts
+    if name_lower in ["deleteditems", "已删除"]: return account.trash
+    if name_lower in ["junk", "垃圾邮件"]: return account.junk
+    return None
+
+def _match_folders(account, folder_name: str) -> list:
+    """Return every folder matching a well-known name, a 'Parent/Child' path or a plain folder name."""
+    name = folder_name.strip()
+    well_known = _well_known_folder(account, name.lower())
+    if well_known is not None:
+        return [well_known]
+
+    # Paths as returned by list/search tools, relative to the mailbox root (e.g. 'Inbox/Projects')
+    parts = [p.strip().lower() for p in name.strip("/").split("/")]
+    if len(parts) > 1:
+        head = _well_known_folder(account, parts[0])
+        matches = [head] if head is not None else [
+            c for c in account.msg_folder_root.children if c.name and c.name.lower() == parts[0]
+        ]
+        for part in parts[1:]:
+            matches = [c for f in matches for c in f.children if c.name and c.name.lower() == part]
+        if matches:
+            return matches
+
+    # Custom folder fallback
+    return [f for f in account.root.walk() if f.name and f.name.lower() == name.lower()]
+
+def get_folder_by_name(account, folder_name: str):
+    """Resolve well-known folder names, 'Parent/Child' paths or search by name."""
+    matches = _match_folders(account, folder_name)
+    if not matches:
+        raise ValueError(f"Folder '{folder_name}' not found.")
+    if len(matches) > 1:
+        paths = ", ".join(folder_path(account, f) for f in matches)
+        raise ValueError(f"Folder '{folder_name}' is ambiguous, use the full path instead: {paths}.")
+    return matches[0]
+
+def resolve_folders(account, folder_spec: str) -> list:
+    """Resolve a comma-separated folder spec. An entry ending in '/**' expands to that folder and its whole subtree."""
+    spec = folder_spec.strip()
+    base = spec[:-3] if spec.endswith("/**") else spec
+    # Folder names may contain commas themselves, so only split when the whole spec is not a folder
+    if base and _match_folders(account, base):
+        entries = [spec]
+    else:
+        entries = [e.strip() for e in spec.split(",") if e.strip()]
+
+    folders = []
+    seen = set()
+    for entry in entries:
+        if entry.endswith("/**"):
+            root = get_folder_by_name(account, entry[:-3])
+            candidates = [root] + list(root.walk())
+        else:
+            candidates = [get_folder_by_name(account, entry)]
+        for f in candidates:
+            if f.id not in seen:
+                seen.add(f.id)
+                folders.append(f)
+    if not folders:
+        raise ValueError("No folder specified.")
+    return folders
+
+def folder_path(account, folder) -> str:
+    """Human readable path of a folder relative to the mailbox root, e.g. 'Inbox/Projects'."""
+    try:
+        parts = folder.parts
+        root_ids = {account.root.id, account.msg_folder_root.id}
+        names = []
+        for p in parts:
+            if p.id in root_ids:
+                names = []
+                continue
+            names.append(p.name)
+        return "/".join(names) or folder.name
+    except Exception:
+        return folder.name
@@ -0,0 +1,179 @@
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from exchangelib.protocol import BaseProtocol
+
+from .config import (
+    EWS_HTTP_TIMEOUT,
+    EWS_SESSION_IDLE_TIMEOUT,
+    EWS_SESSION_MAX_USAGE,
+    EWS_TCP_KEEPALIVE,
+)
+
+logger = logging.getLogger("ews_mcp")
+
+
+class PoolMetrics:
+    """Thread-safe counters describing how the EWS session pool is being used."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.acquisitions = 0
+            self.sessions_created = 0
+            self.handshakes = 0
+            self.idle_renewals = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record_acquire(self, wait: float):
+        with self._lock:
+            self.acquisitions += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_session(self):
+        with self._lock:
+            self.sessions_created += 1
+
+    def record_handshake(self):
+        with self._lock:
+            self.handshakes += 1
+
+    def record_idle_renewal(self):
+        with self._lock:
+            self.idle_renewals += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            reused = max(self.acquisitions - self.handshakes, 0)
+            return {
+                "acquisitions": self.acquisitions,
+                "sessions_created": self.sessions_created,
+                "handshakes": self.handshakes,
+                "reused": reused,
+                "reuse_ratio": round(reused / self.acquisitions, 3) if self.acquisitions else None,
+                "idle_renewals": self.idle_renewals,
+                "total_wait_ms": round(self.total_wait * 1000, 1),
+                "avg_wait_ms": round(self.total_wait * 1000 / self.acquisitions, 2) if self.acquisitions else None,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        # A new socket means a fresh TCP (+ NTLM) handshake, including silent reconnects after the server dropped one
+        pool_metrics.record_handshake()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        # A new socket means a fresh TCP + TLS + NTLM handshake, including silent reconnects after the server dropped one
+        pool_metrics.record_handshake()
+        return super()._new_conn()
+
+
+class KeepAliveAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that enables TCP keep-alive so idle pooled connections survive firewalls and load balancers."""
+    def init_poolmanager(self, *args, **kwargs):
+        if EWS_TCP_KEEPALIVE > 0:
+            options = list(HTTPConnection.default_socket_options)
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            # TCP_KEEPIDLE/KEEPINTVL are not available on every platform (e.g. Windows)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, EWS_TCP_KEEPALIVE))
+            if hasattr(socket, "TCP_KEEPINTVL"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(EWS_TCP_KEEPALIVE // 3, 1)))
+            kwargs['socket_options'] = options
+        result = super(KeepAliveAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+        return result
+
+
+def _instrument_protocol():
+    """Wrap BaseProtocol session handling to collect metrics and retire idle sessions."""
+    original_get = BaseProtocol.get_session
+    original_release = BaseProtocol.release_session
+    original_create = BaseProtocol.create_session
+
+    def create_session(self):
+        # Session objects are cheap to create; the actual handshakes are counted per socket in the connection pool
+        session = original_create(self)
+        pool_metrics.record_session()
+        return session
+
+    def get_session(self):
+        start = time.monotonic()
+        session = original_get(self)
+        last_used = getattr(session, "last_used", None)
+        if EWS_SESSION_IDLE_TIMEOUT > 0 and last_used is not None and start - last_used > EWS_SESSION_IDLE_TIMEOUT:
+            # The server has most likely dropped this connection already, start over instead of failing a request
+            logger.debug("Renewing EWS session %s idle for %.0fs", session.session_id, start - last_used)
+            usage_count = session.usage_count
+            session = self.renew_session(session)
+            session.usage_count = usage_count
+            pool_metrics.record_idle_renewal()
+        pool_metrics.record_acquire(time.monotonic() - start)
+        return session
+
+    def release_session(self, session):
+        session.last_used = time.monotonic()
+        return original_release(self, session)
+
+    BaseProtocol.create_session = create_session
+    BaseProtocol.get_session = get_session
+    BaseProtocol.release_session = release_session
+
+
+def configure_pool(adapter_cls=KeepAliveAdapter):
+    """Apply pool sizing, timeouts and keep-alive settings to exchangelib globally."""
+    BaseProtocol.HTTP_ADAPTER_CLS = adapter_cls
+    BaseProtocol.TIMEOUT = EWS_HTTP_TIMEOUT
+    BaseProtocol.MAX_SESSION_USAGE_COUNT = EWS_SESSION_MAX_USAGE or None
+    _instrument_protocol()
+
+
+def prewarm_sessions(protocol, count: int):
+    """Open and authenticate `count` pooled sessions up front so the first tool calls skip the handshake."""
+    count = min(count, protocol.max_connections)
+    if count <= 0:
+        return
+    logger.info("Pre-warming %d EWS connection(s)...", count)
+    # Hold all sessions at once so the pool is forced to create distinct ones
+    sessions = [protocol.get_session() for _ in range(count)]
+
+    def _warm(session):
+        try:
+            session.get(protocol.service_endpoint, timeout=protocol.TIMEOUT, allow_redirects=False)
+        except Exception as e:
+            logger.warning("Failed to pre-warm EWS session %s: %s", session.session_id, e)
+
+    try:
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            list(executor.map(_warm, sessions))
+    finally:
+        for session in sessions:
+            protocol.release_session(session)
+
+
+def get_pool_stats(protocol) -> dict:
+    """Return pool sizing together with the collected metrics."""
+    stats = pool_metrics.snapshot()
+    stats["max_connections"] = protocol.max_connections
+    stats["open_sessions"] = protocol.session_pool_size
+    return stats
@@ -1,5 +1,6 @@
 import logging
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from mcp.server.fastmcp import FastMCP
 from exchangelib import Message, Mailbox, Q, FolderCollection
@@ -10,6 +11,10 @@ import bs4
 from .client import get_ews_client
 from .utils import build_email_body
 from .idempotency import IdempotencyManager
+from .pool import get_pool_stats
+from .folders import get_folder_by_name, resolve_folders, folder_path
+from .export import export_messages
+from .config import EWS_EXPORT_DIR, EWS_MAX_CONNECTIONS
 
 logger = logging.getLogger("ews_mcp")
 
@@ -26,22 +31,33 @@ def html_to_text(html: str) -> str:
     except Exception:
         return html
 
-def get_folder_by_name(account, folder_name: str):
-    """Resolve well-known folder names or search by name."""
-    name_lower = folder_name.lower().strip()
-    if name_lower in ["inbox", "收件箱"]: return account.inbox
-    if name_lower in ["sent", "sentitems", "已发送"]: return account.sent
-    if name_lower in ["drafts", "草稿箱"]: return account.drafts
-    if name_lower in ["deleteditems", "已删除"]: return account.trash
-    if name_lower in ["junk", "垃圾邮件"]: return account.junk
-    
-    # Custom folder fallback
-    for f in account.root.walk():
-        if f.name and f.name.lower() == name_lower:
-            return f
-    raise ValueError(f"Folder '{folder_name}' not found.")
+MESSAGE_FIELDS = ('id', 'subject', 'sender', 'datetime_received', 'is_read', 'has_attachments')
+
+def _newest_messages(account, folder_name: str, limit: int, fetch_body: bool = False, query: str = None):
+    """Return (folders, paths, [(path, item)]) with the newest `limit` messages across a folder spec.
+
+    EWS only sorts within a folder, so each folder is queried on its own (in parallel) and the
+    hits are merged by datetime_received before the global limit is applied."""
+    folders = resolve_folders(account, folder_name)
+    paths = [folder_path(account, f) for f in folders]
+    fields = MESSAGE_FIELDS + ('body',) if fetch_body else MESSAGE_FIELDS
+
+    def _query(folder):
+        # Exchangelib natively supports AQS by just passing string to filter/all
+        qs = folder.filter(query) if query else folder.all()
+        return list(qs.order_by('-datetime_received').only(*fields)[:limit])
 
-def _format_item(item, fetch_body=False):
+    if len(folders) == 1:
+        results = [_query(folders[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(folders), EWS_MAX_CONNECTIONS)) as executor:
+            results = list(executor.map(_query, folders))
+
+    hits = [(path, item) for path, items in zip(paths, results) for item in items]
+    hits.sort(key=lambda h: (h[1].datetime_received is not None, h[1].datetime_received), reverse=True)
+    return folders, paths, hits[:limit]
+
+def _format_item(item, fetch_body=False, folder_label=None):
     """Serialize exchangelib item to dict."""
     res = {
         "id": item.id,
@@ -51,6 +67,8 @@ def _format_item(item, fetch_body=False):
         "is_read": item.is_read if hasattr(item, 'is_read') else True,
         "has_attachments": item.has_attachments if hasattr(item, 'has_attachments') else False
     }
+    if folder_label is not None:
+        res["folder"] = folder_label
     if fetch_body:
         res["body"] = html_to_text(item.body) if item.body else ""
         res["html_body"] = str(item.body) if item.body else ""
@@ -62,23 +80,17 @@ def _format_item(item, fetch_body=False):
 
 @mcp.tool()
 def list_messages(folder_name: str = "inbox", limit: int = 20, fetch_body: bool = False) -> str:
-    """List newest messages in a folder (e.g. 'inbox', 'sent')."""
+    """List newest messages in a folder (e.g. 'inbox', 'sent'). Accepts comma-separated folders or a subtree like 'inbox/**'."""
     account = get_ews_client()
-    folder = get_folder_by_name(account, folder_name)
-    
-    qs = folder.all().order_by('-datetime_received')
-    
-    if fetch_body:
-        qs = qs.only('id', 'subject', 'sender', 'datetime_received', 'is_read', 'has_attachments', 'body')
-    else:
-        qs = qs.only('id', 'subject', 'sender', 'datetime_received', 'is_read', 'has_attachments')
+    folders, paths, hits = _newest_messages(account, folder_name, limit, fetch_body=fetch_body)
     
     messages = []
-    for item in qs[:limit]:
-        messages.append(_format_item(item, fetch_body=fetch_body))
+    for path, item in hits:
+        messages.append(_format_item(item, fetch_body=fetch_body, folder_label=path))
         
     import json
-    return json.dumps({"folder": folder.name, "count": len(messages), "messages": messages}, ensure_ascii=False)
+    folder_label = folders[0].name if len(folders) == 1 else folder_name
+    return json.dumps({"folder": folder_label, "folders": paths, "count": len(messages), "messages": messages}, ensure_ascii=False)
 
 
 @mcp.tool()
@@ -101,19 +113,13 @@ def get_message_details(message_id: str) -> str:
 
 @mcp.tool()
 def search_messages(query: str, folder_name: str = "inbox", limit: int = 10, fetch_body: bool = False) -> str:
-    """Search messages using keywords (e.g. 'subject:Project')."""
+    """Search messages using keywords (e.g. 'subject:Project'). Accepts comma-separated folders or a subtree like 'inbox/**'."""
     account = get_ews_client()
-    folder = get_folder_by_name(account, folder_name)
-    
-    # Exchangelib natively supports AQS by just passing string to filter/all
-    qs = folder.filter(query).order_by('-datetime_received')
-    
-    if fetch_body:
-        qs = qs.only('id', 'subject', 'sender', 'datetime_received', 'is_read', 'has_attachments', 'body')
+    folders, paths, hits = _newest_messages(account, folder_name, limit, fetch_body=fetch_body, query=query)
         
-    messages = [_format_item(item, fetch_body) for item in qs[:limit]]
+    messages = [_format_item(item, fetch_body, folder_label=path) for path, item in hits]
     import json
-    return json.dumps({"success": True, "query": query, "count": len(messages), "messages": messages}, ensure_ascii=False)
+    return json.dumps({"success": True, "query": query, "folders": paths, "count": len(messages), "messages": messages}, ensure_ascii=False)
 
 
 @mcp.tool()
@@ -231,6 +237,46 @@ def get_attachment_content(message_id: str, attachment_name: str) -> str:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
+@mcp.tool()
+async def export_folder(
+    output_path: str,
+    folder_name: str = "inbox",
+    export_format: str = "mbox",
+    query: str = "",
+    start_date: str = "",
+    end_date: str = "",
+    batch_size: int = 50,
+    max_messages: int = 500,
+    resume: bool = True
+) -> str:
+    """Bulk export a folder to an mbox file or a directory of .eml files (export_format 'mbox' or 'eml').
+    output_path is relative to the server export directory. Dates are ISO (e.g. '2024-01-01').
+    Each call handles at most max_messages messages; while the result has completed=false,
+    call again with the same arguments to continue from the checkpoint."""
+    def _run():
+        import os
+        export_root = os.path.abspath(EWS_EXPORT_DIR)
+        target = os.path.abspath(os.path.join(export_root, output_path))
+        if os.path.commonpath([export_root, target]) != export_root or target == export_root:
+            raise ValueError(f"output_path must be inside the export directory {export_root}.")
+        account = get_ews_client()
+        folders = resolve_folders(account, folder_name)
+        return export_messages(
+            account, folders, target,
+            export_format=export_format, query=query, start_date=start_date, end_date=end_date,
+            batch_size=batch_size, resume=resume, max_messages=max_messages
+        )
+
+    try:
+        # Exports are long-running and blocking; keep them off the event loop so other tool calls are served
+        result = await asyncio.to_thread(_run)
+        import json
+        return json.dumps({"success": True, **result}, ensure_ascii=False)
+    except Exception as e:
+        import json
+        return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
+
+
 # ---------------------------------------------------------
 # Write Operations
 # ---------------------------------------------------------
@@ -463,6 +509,14 @@ def batch_move_messages(message_ids: str, destination_folder: str) -> str:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
+@mcp.tool()
+def get_connection_stats() -> str:
+    """Report EWS connection pool usage: handshakes, reuse ratio and time spent waiting for a free connection."""
+    account = get_ews_client()
+    import json
+    return json.dumps({"success": True, "pool": get_pool_stats(account.protocol)}, ensure_ascii=False)
+
+
 def serve_stdio():
     """Run FastMCP via stdio"""
     mcp.run(transport="stdio")
@@ -0,0 +1,178 @@
+import mailbox
+import os
+
+import pytest
+
+# config.py refuses to import without credentials; the export path never talks to a real server here
+os.environ.setdefault("EWS_ENDPOINT", "https://mail.example.com/EWS/Exchange.asmx")
+os.environ.setdefault("EWS_USERNAME", "tester@example.com")
+os.environ.setdefault("EWS_PASSWORD", "secret")
+
+from exchangelib import EWSDateTime, UTC  # noqa: E402
+
+from src.ews_exchange_mcp.export import ID_PAGE_SIZE, export_messages  # noqa: E402
+
+
+class FakeMessage:
+    def __init__(self, item_id, day, hour=0):
+        self.id = item_id
+        self.changekey = "ck"
+        self.datetime_received = EWSDateTime(2024, 1, day, hour, tzinfo=UTC)
+
+
+class FakeQuerySet:
+    def __init__(self, folder, items):
+        self.folder = folder
+        self.items = items
+        self.page_size = None
+
+    def filter(self, *args, **kwargs):
+        items = self.items
+        if 'datetime_received__gte' in kwargs:
+            items = [i for i in items if i.datetime_received >= kwargs['datetime_received__gte']]
+        if 'datetime_received__lt' in kwargs:
+            items = [i for i in items if i.datetime_received < kwargs['datetime_received__lt']]
+        return FakeQuerySet(self.folder, items)
+
+    def order_by(self, field):
+        return FakeQuerySet(self.folder, sorted(self.items, key=lambda i: i.datetime_received))
+
+    def only(self, *fields):
+        return self
+
+    def __getitem__(self, s):
+        return self._iterate(s.start or 0)
+
+    def __iter__(self):
+        return self._iterate(0)
+
+    def _iterate(self, offset):
+        for item in self.items[offset:]:
+            self.folder.ids_read += 1
+            yield item
+
+
+class FakeFolder:
+    def __init__(self, folder_id, messages):
+        self.id = folder_id
+        self.messages = messages
+        self.ids_read = 0
+
+    def all(self):
+        return FakeQuerySet(self, list(self.messages))
+
+    def filter(self, *args, **kwargs):
+        return FakeQuerySet(self, list(self.messages)).filter(*args, **kwargs)
+
+
+class FakeSender:
+    email_address = "sender@example.com"
+
+
+class FakeFetched:
+    def __init__(self, ref):
+        self.id = ref.id
+        self.datetime_received = ref.datetime_received
+        self.sender = FakeSender()
+        self.mime_content = f"Subject: {ref.id}\r\n\r\nBody of {ref.id}\r\n".encode()
+
+
+class FakeAccount:
+    default_timezone = UTC
+
+    def __init__(self, fail_after=None):
+        self.fetch_calls = 0
+        self.fail_after = fail_after
+
+    def fetch(self, ids, only_fields=None, chunk_size=None):
+        self.fetch_calls += 1
+        if self.fail_after is not None and self.fetch_calls > self.fail_after:
+            raise ConnectionError("connection dropped")
+        return [FakeFetched(FakeMessage(item_id, 1)) for item_id, _ in ids]
+
+
+def _subjects(path):
+    return [m['Subject'] for m in mailbox.mbox(path)]
+
+
+def _run_until_complete(account, folders, output, **kwargs):
+    calls = 0
+    while True:
+        calls += 1
+        result = export_messages(account, folders, output, batch_size=2, workers=2, **kwargs)
+        if result["completed"]:
+            return calls
+        assert calls < 50
+
+
+def test_resume_across_two_folders_exports_every_message_once(tmp_path):
+    inbox = FakeFolder("inbox", [FakeMessage("a1", 1), FakeMessage("a3", 3), FakeMessage("a5", 5)])
+    archive = FakeFolder("archive", [FakeMessage("b2", 2), FakeMessage("b4", 4)])
+    output = str(tmp_path / "out.mbox")
+
+    calls = _run_until_complete(FakeAccount(), [inbox, archive], output, max_messages=2)
+
+    assert calls == 3
+    assert _subjects(output) == ["a1", "a3", "a5", "b2", "b4"]
+
+
+def test_resume_after_failure_mid_export(tmp_path):
+    inbox = FakeFolder("inbox", [FakeMessage("a1", 1), FakeMessage("a3", 3), FakeMessage("a5", 5)])
+    archive = FakeFolder("archive", [FakeMessage("b2", 2), FakeMessage("b4", 4)])
+    output = str(tmp_path / "out.mbox")
+
+    with pytest.raises(ConnectionError):
+        export_messages(FakeAccount(fail_after=2), [inbox, archive], output, batch_size=2, workers=1)
+
+    result = export_messages(FakeAccount(), [inbox, archive], output, batch_size=2, workers=1)
+
+    assert result["completed"]
+    assert _subjects(output) == ["a1", "a3", "a5", "b2", "b4"]
+
+
+def test_query_mode_covers_all_folders_and_resumes_from_offset(tmp_path):
+    inbox = FakeFolder("inbox", [FakeMessage(f"a{n}", 1 + n // 24, n % 24) for n in range(600)])
+    archive = FakeFolder("archive", [FakeMessage("b1", 1), FakeMessage("b2", 2)])
+    output = str(tmp_path / "out.mbox")
+    reads = []
+
+    def _call():
+        before = inbox.ids_read
+        result = export_messages(
+            FakeAccount(), [inbox, archive], output, query="subject:a", end_date="2024-01-20",
+            batch_size=50, workers=2, max_messages=100
+        )
+        reads.append(inbox.ids_read - before)
+        return result
+
+    while not _call()["completed"]:
+        assert len(reads) < 50
+
+    subjects = _subjects(output)
+    assert len(subjects) == len(set(subjects)) == 19 * 24 + 2
+    assert subjects[-2:] == ["b1", "b2"]
+    # Later calls continue from the stored FindItem offset instead of re-reading the folder from the start
+    assert max(reads) <= 100 + ID_PAGE_SIZE + 1
+
+
+def test_incremental_run_after_completion_only_adds_new_mail(tmp_path):
+    inbox = FakeFolder("inbox", [FakeMessage("a1", 1)])
+    archive = FakeFolder("archive", [FakeMessage("b2", 2)])
+    output = str(tmp_path / "out.mbox")
+    export_messages(FakeAccount(), [inbox, archive], output)
+
+    inbox.messages.append(FakeMessage("a9", 9))
+    result = export_messages(FakeAccount(), [inbox, archive], output)
+
+    assert result["processed_this_call"] == 1
+    assert _subjects(output) == ["a1", "b2", "a9"]
+
+
+def test_resume_with_missing_mbox_raises(tmp_path):
+    inbox = FakeFolder("inbox", [FakeMessage("a1", 1), FakeMessage("a2", 2)])
+    output = str(tmp_path / "out.mbox")
+    export_messages(FakeAccount(), [inbox], output, max_messages=1)
+    os.remove(output)
+
+    with pytest.raises(ValueError, match="EXPORT_CHECKPOINT_MISMATCH"):
+        export_messages(FakeAccount(), [inbox], output)